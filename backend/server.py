@@ -1,43 +1,127 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
 import socketio
+from socketio.msgpack_packet import MsgPackPacket
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable
+from collections import OrderedDict, defaultdict
+import asyncio
+import hashlib
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import json
+import orjson
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+logger = logging.getLogger(__name__)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_POOL', 50)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL', 10)),
+    # Compress BSON on the wire; zlib is the always-available fallback
+    compressors=os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib')
+)
 db = client[os.environ['DB_NAME']]
 
-# Create Socket.IO server
+# Socket.IO payload encoding
+class PreEncoded:
+    """Payload serialized once with orjson and spliced verbatim into packets"""
+    __slots__ = ("obj", "raw", "_etag")
+
+    def __init__(self, obj: Any):
+        # The source object is kept for the msgpack serializer, which can't splice JSON
+        self.obj = obj
+        self.raw = orjson.dumps(obj, default=str)
+        self._etag = None
+
+    @property
+    def etag(self) -> str:
+        """Strong validator derived from the encoded bytes"""
+        if self._etag is None:
+            self._etag = '"%s"' % hashlib.blake2b(self.raw, digest_size=16).hexdigest()
+        return self._etag
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, PreEncoded):
+        return orjson.Fragment(obj.raw)
+    # ObjectId and other BSON scalars
+    return str(obj)
+
+class OrjsonJSON:
+    """Drop-in for the json module so python-socketio encodes with orjson"""
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        return orjson.dumps(obj, default=_orjson_default).decode()
+
+    @staticmethod
+    def loads(s, *args, **kwargs) -> Any:
+        return orjson.loads(s)
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, PreEncoded):
+        return obj.obj
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    # ObjectId and other BSON scalars
+    return str(obj)
+
+# SIO_SERIALIZER=msgpack ships binary msgpack frames; clients must use the
+# matching socket.io-msgpack-parser (REACT_APP_SIO_MSGPACK=1 in the frontend)
+sio_serializer = 'default'
+if os.environ.get('SIO_SERIALIZER') == 'msgpack':
+    sio_serializer = MsgPackPacket.configure(dumps_default=_msgpack_default)
+
+# Share broadcasts across uvicorn workers through Redis when configured
+redis_url = os.environ.get('REDIS_URL')
+client_manager = socketio.AsyncRedisManager(
+    redis_url,
+    channel=os.environ.get('SIO_REDIS_CHANNEL', 'socketio')
+) if redis_url else None
+
+# Allowed origins shared by Socket.IO and the REST CORS middleware
+cors_origins = [origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',')]
+
+# Create Socket.IO server; per-packet logging only when SIO_DEBUG=1
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins="*",
-    logger=True
+    client_manager=client_manager,
+    cors_allowed_origins="*" if cors_origins == ["*"] else cors_origins,
+    logger=os.environ.get('SIO_DEBUG') == '1',
+    engineio_logger=False,
+    serializer=sio_serializer,
+    json=OrjsonJSON
 )
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
+# Upper bound on pins accepted by one bulk import
+MAX_BULK_PINS = int(os.environ.get('MAX_BULK_PINS', 500))
+
 # Models
 class GeoPoint(BaseModel):
     type: str = "Point"
     coordinates: List[float]  # [longitude, latitude]
 
 class Pin(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     room_id: str
     title: str
     description: Optional[str] = ""
@@ -55,8 +139,11 @@ class PinCreate(BaseModel):
     longitude: float
     created_by: str
 
+class PinBulkCreate(BaseModel):
+    pins: List[PinCreate] = Field(..., max_length=MAX_BULK_PINS)
+
 class Room(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     name: str
     description: Optional[str] = ""
     created_by: str
@@ -70,7 +157,7 @@ class RoomCreate(BaseModel):
     created_by: str
 
 class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     name: str
     email: Optional[str] = ""
     avatar: Optional[str] = ""
@@ -81,22 +168,123 @@ class UserCreate(BaseModel):
     email: Optional[str] = ""
     avatar: Optional[str] = ""
 
+# Hard cap on pins returned by list queries
+MAX_PINS_PER_ROOM = int(os.environ.get('MAX_PINS_PER_ROOM', 10000))
+
+# List queries skip Mongo's ObjectId, the scalar lng/lat copies of location
+# and the migration's legacy flag; voted_by stays since clients render vote
+# state from it
+PIN_LIST_PROJECTION = {"_id": 0, "lng": 0, "lat": 0, "legacy": 0}
+
+# A migration claim older than this without finished_at is retried
+MIGRATION_LEASE = timedelta(minutes=int(os.environ.get('MIGRATION_LEASE_MINUTES', 15)))
+
 # GeoStore interface for future PostGIS migration
 class GeoStore:
     def __init__(self, database):
         self.db = database
+        self._legacy_pins_migrated = False
         
     async def create_spatial_indexes(self):
-        """Create 2dsphere indexes for MongoDB spatial queries"""
-        await self.db.pins.create_index([("location", "2dsphere")])
+        """Create 2dsphere and lookup indexes for pins in one createIndexes call"""
+        # Explicit names match MongoDB's generated defaults, so deployments
+        # that already have these indexes don't hit IndexOptionsConflict
+        await self.db.pins.create_indexes([
+            IndexModel([("location", "2dsphere")], name="location_2dsphere"),
+            IndexModel([("room_id", 1)], name="room_id_1"),
+            IndexModel([("room_id", 1), ("location", "2dsphere")], name="room_id_1_location_2dsphere"),
+            IndexModel([("id", 1)], name="id_1", unique=True),
+        ])
+        # Centroids come from room_stats now; the rare pin scan is served by
+        # room_id_1, so this index only slowed every insert down
+        try:
+            await self.db.pins.drop_index("room_id_1_lng_1_lat_1")
+        except OperationFailure:
+            pass
+        
+    async def _claim_migration(self, name: str) -> bool:
+        """Claim a one-shot migration; False if another worker holds it or it
+        already finished. A claim that never finished is taken over once its
+        lease expires, so a crashed run is retried on a later boot."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.migrations.insert_one({"_id": name, "started_at": now})
+            return True
+        except DuplicateKeyError:
+            pass
+        claimed = await self.db.migrations.find_one_and_update(
+            {
+                "_id": name,
+                "finished_at": {"$exists": False},
+                "started_at": {"$lt": now - MIGRATION_LEASE}
+            },
+            {"$set": {"started_at": now}}
+        )
+        return claimed is not None
+        
+    async def _release_migration(self, name: str):
+        await self.db.migrations.delete_one({"_id": name, "finished_at": {"$exists": False}})
         
-    async def find_pins_in_room(self, room_id: str) -> List[Dict]:
+    async def _finish_migration(self, name: str):
+        await self.db.migrations.update_one(
+            {"_id": name}, {"$set": {"finished_at": datetime.now(timezone.utc)}}
+        )
+        
+    async def _migration_finished(self, name: str) -> bool:
+        marker = await self.db.migrations.find_one({"_id": name})
+        return bool(marker and marker.get("finished_at"))
+        
+    async def migrate_legacy_pins(self):
+        """Bring pins written before room_stats and scalar lng/lat up to date.
+
+        Pins stored since then always carry lng and are counted in room_stats
+        as they are inserted. Legacy pins get lng/lat plus a legacy flag, and
+        their per-room sums are recomputed into separate legacy_* fields of
+        room_stats, so live $incs are never touched. Both steps are
+        idempotent, which makes an interrupted or concurrent run safe to
+        repeat: a failure releases the claim for the next boot, and a crash
+        is retried once the lease expires. Until finished_at is set,
+        calculate_centroid scans pins instead of trusting room_stats.
+        """
+        if not await self._claim_migration("legacy_pins"):
+            return
+        try:
+            await self.db.pins.update_many(
+                {"lng": {"$exists": False}},
+                [{"$set": {
+                    "lng": {"$arrayElemAt": ["$location.coordinates", 0]},
+                    "lat": {"$arrayElemAt": ["$location.coordinates", 1]},
+                    "legacy": True
+                }}]
+            )
+            await self.db.pins.aggregate([
+                {"$match": {"legacy": True}},
+                {"$group": {
+                    "_id": "$room_id",
+                    "legacy_sum_lng": {"$sum": "$lng"},
+                    "legacy_sum_lat": {"$sum": "$lat"},
+                    "legacy_count": {"$sum": 1}
+                }},
+                {"$merge": {"into": "room_stats", "whenMatched": "merge", "whenNotMatched": "insert"}}
+            ]).to_list(None)
+        except PyMongoError:
+            logger.exception("Legacy pin migration failed; it will be retried on the next boot")
+            await self._release_migration("legacy_pins")
+            return
+        await self._finish_migration("legacy_pins")
+        
+    async def find_pins_in_room(self, room_id: str, projection: Optional[Dict] = None) -> List[Dict]:
         """Find all pins in a specific room"""
-        pins = await self.db.pins.find({"room_id": room_id}).to_list(None)
+        if projection is None:
+            projection = PIN_LIST_PROJECTION
+        cursor = self.db.pins.find({"room_id": room_id}, projection).limit(MAX_PINS_PER_ROOM)
+        pins = []
+        async for pin in cursor:
+            pins.append(pin)
         return pins
         
-    async def find_nearest_pins(self, longitude: float, latitude: float, max_distance: int = 10000) -> List[Dict]:
-        """Find pins within max_distance meters from point"""
+    async def find_nearest_pins(self, longitude: float, latitude: float, max_distance: int = 10000, room_id: Optional[str] = None, projection: Optional[Dict] = None) -> List[Dict]:
+        """Find pins within max_distance meters from point, optionally within a room"""
         query = {
             "location": {
                 "$near": {
@@ -105,22 +293,59 @@ class GeoStore:
                 }
             }
         }
-        pins = await self.db.pins.find(query).to_list(None)
+        if room_id:
+            # Equality on the prefix lets $near use the {room_id, location} index
+            query["room_id"] = room_id
+        if projection is None:
+            projection = PIN_LIST_PROJECTION
+        cursor = self.db.pins.find(query, projection).limit(MAX_PINS_PER_ROOM)
+        pins = []
+        async for pin in cursor:
+            pins.append(pin)
         return pins
         
+    async def update_room_stats(self, room_id: str, sum_lng: float, sum_lat: float, count: int):
+        """Apply a delta to a room's running coordinate sums (negative on delete)"""
+        await self.db.room_stats.update_one(
+            {"_id": room_id},
+            {"$inc": {"sum_lng": sum_lng, "sum_lat": sum_lat, "count": count}},
+            upsert=True
+        )
+        
     async def calculate_centroid(self, room_id: str) -> Optional[Dict]:
-        """Calculate the centroid of all pins in a room"""
+        """Calculate the centroid of all pins in a room from its running sums"""
+        if not self._legacy_pins_migrated:
+            # Until then room_stats may miss legacy pins; scanning stays exact
+            self._legacy_pins_migrated = await self._migration_finished("legacy_pins")
+            if not self._legacy_pins_migrated:
+                return await self._scan_centroid(room_id)
+        
+        stats = await self.db.room_stats.find_one({"_id": room_id})
+        if stats is None:
+            return await self._scan_centroid(room_id)
+        count = stats.get("count", 0) + stats.get("legacy_count", 0)
+        if count <= 0:
+            return None
+        return {
+            "longitude": (stats.get("sum_lng", 0.0) + stats.get("legacy_sum_lng", 0.0)) / count,
+            "latitude": (stats.get("sum_lat", 0.0) + stats.get("legacy_sum_lat", 0.0)) / count,
+            "type": "centroid"
+        }
+        
+    async def _scan_centroid(self, room_id: str) -> Optional[Dict]:
+        # Rooms reach this before the legacy migration has given their pins
+        # scalar lng/lat, so fall back to the GeoJSON coordinates
         pipeline = [
             {"$match": {"room_id": room_id}},
             {"$group": {
                 "_id": None,
-                "avgLng": {"$avg": {"$arrayElemAt": ["$location.coordinates", 0]}},
-                "avgLat": {"$avg": {"$arrayElemAt": ["$location.coordinates", 1]}},
+                "avgLng": {"$avg": {"$ifNull": ["$lng", {"$arrayElemAt": ["$location.coordinates", 0]}]}},
+                "avgLat": {"$avg": {"$ifNull": ["$lat", {"$arrayElemAt": ["$location.coordinates", 1]}]}},
                 "count": {"$sum": 1}
             }}
         ]
         result = await self.db.pins.aggregate(pipeline).to_list(None)
-        if result and result[0]["count"] > 0:
+        if result and result[0]["count"] > 0 and None not in (result[0]["avgLng"], result[0]["avgLat"]):
             return {
                 "longitude": result[0]["avgLng"],
                 "latitude": result[0]["avgLat"],
@@ -131,6 +356,212 @@ class GeoStore:
 # Initialize GeoStore
 geo_store = GeoStore(db)
 
+class _PinLoad:
+    """A pin query in flight, shared by every caller that asks meanwhile"""
+    __slots__ = ("task", "stale")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.stale = False
+
+class RoomPinCache:
+    """In-process LRU cache of encoded pins per room, invalidated on pin writes"""
+    def __init__(self, ttl: float = 30.0, max_rooms: int = 1000):
+        # TTL is only a safety net against missed invalidations
+        self.ttl = ttl
+        self.max_rooms = max_rooms
+        self._entries: "OrderedDict[str, Tuple[float, PreEncoded]]" = OrderedDict()
+        # Only rooms with a query in flight have an entry here
+        self._loading: Dict[str, _PinLoad] = {}
+
+    def _fresh(self, room_id: str) -> Optional[PreEncoded]:
+        entry = self._entries.get(room_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._entries[room_id]
+            return None
+        self._entries.move_to_end(room_id)
+        return entry[1]
+
+    def _store(self, room_id: str, payload: PreEncoded):
+        self._entries[room_id] = (time.monotonic(), payload)
+        self._entries.move_to_end(room_id)
+        while len(self._entries) > self.max_rooms:
+            self._entries.popitem(last=False)
+
+    async def _load(self, room_id: str, load: _PinLoad, loader: Callable[[str], Awaitable[List[Dict]]]) -> PreEncoded:
+        try:
+            # Serialize once so every joiner reuses the same bytes
+            payload = PreEncoded(await loader(room_id))
+            # Don't store a result that was invalidated while loading
+            if not load.stale:
+                self._store(room_id, payload)
+            return payload
+        finally:
+            if self._loading.get(room_id) is load:
+                del self._loading[room_id]
+
+    async def get_payload(self, room_id: str, loader: Callable[[str], Awaitable[List[Dict]]]) -> PreEncoded:
+        """Return the pins for a room as a pre-encoded payload, loading them
+        once for concurrent callers"""
+        payload = self._fresh(room_id)
+        if payload is not None:
+            return payload
+
+        load = self._loading.get(room_id)
+        if load is None:
+            load = self._loading[room_id] = _PinLoad()
+            load.task = asyncio.ensure_future(self._load(room_id, load, loader))
+        # A cancelled caller must not cancel the load other callers share
+        return await asyncio.shield(load.task)
+
+    def invalidate(self, room_id: Optional[str]):
+        """Drop cached pins for a room after any pin write"""
+        if not room_id:
+            return
+        self._entries.pop(room_id, None)
+        # Callers arriving from now on start a fresh query
+        load = self._loading.pop(room_id, None)
+        if load is not None:
+            load.stale = True
+
+    def clear(self):
+        """Drop every cached room, e.g. after missing remote invalidations"""
+        for room_id in list(self._entries) + list(self._loading):
+            self.invalidate(room_id)
+
+# Initialize pin cache
+pin_cache = RoomPinCache(
+    ttl=float(os.environ.get('PIN_CACHE_TTL', 30)),
+    max_rooms=int(os.environ.get('PIN_CACHE_MAX_ROOMS', 1000))
+)
+
+class EmitBatcher:
+    """Coalesces pin events per room into one pin_batch emit per window"""
+    def __init__(self, server: socketio.AsyncServer, window: float = 0.01):
+        self.server = server
+        self.window = window
+        self._pending: Dict[str, List[Dict]] = {}
+        self._tasks: set = set()
+
+    def enqueue(self, room_id: Optional[str], event: Dict):
+        """Queue an event for a room; the first event opens the window"""
+        if not room_id:
+            return
+        pending = self._pending.get(room_id)
+        if pending is not None:
+            pending.append(event)
+            return
+
+        self._pending[room_id] = [event]
+        task = asyncio.create_task(self._flush_later(room_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, room_id: str):
+        await asyncio.sleep(self.window)
+        await self._flush(room_id)
+
+    async def _flush(self, room_id: str):
+        events = self._pending.pop(room_id, None)
+        if not events:
+            return
+        try:
+            await self.server.emit('pin_batch', events, room=room_id)
+        except Exception:
+            logger.exception("Failed to emit pin batch to room %s", room_id)
+
+    async def flush_all(self):
+        """Emit everything still buffered, e.g. on shutdown"""
+        for room_id in list(self._pending):
+            await self._flush(room_id)
+
+class PinCacheBus:
+    """Relays pin cache invalidations to the other workers over Redis pub/sub"""
+    def __init__(self, cache: RoomPinCache, url: str, channel: str, timeout: float = 1.0):
+        self.cache = cache
+        self.channel = channel
+        self.host_id = uuid.uuid4().hex
+        # publish is awaited on every pin write, so a stalled Redis must fail fast
+        self.redis = aioredis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        # The subscriber blocks on reads while the channel is idle, so only its
+        # connect is bounded; health checks catch a dead connection instead
+        self.subscriber = aioredis.Redis.from_url(
+            url, socket_connect_timeout=timeout, health_check_interval=30
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, room_id: str):
+        try:
+            await self.redis.publish(
+                self.channel, orjson.dumps({"host_id": self.host_id, "room_id": room_id})
+            )
+        except RedisError:
+            logger.warning("Failed to publish pin cache invalidation for room %s", room_id)
+
+    def _handle(self, message: Dict):
+        try:
+            data = orjson.loads(message["data"])
+            host_id, room_id = data["host_id"], data["room_id"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logger.warning("Ignoring malformed pin cache invalidation: %r", message.get("data"))
+            return
+        if host_id != self.host_id:
+            self.cache.invalidate(room_id)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.subscriber.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published while we were not subscribed is lost
+                self.cache.clear()
+                async for message in pubsub.listen():
+                    self._handle(message)
+            except RedisError:
+                logger.warning("Pin cache invalidation channel lost, resubscribing")
+                await asyncio.sleep(1)
+            except Exception:
+                logger.exception("Pin cache invalidation listener failed, resubscribing")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    @staticmethod
+    def _listener_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Pin cache invalidation listener stopped", exc_info=task.exception())
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen())
+        self._task.add_done_callback(self._listener_done)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.redis.aclose()
+        await self.subscriber.aclose()
+
+# Other workers cache pins too, so writes must reach them when running behind Redis
+pin_cache_bus = PinCacheBus(
+    pin_cache,
+    redis_url,
+    os.environ.get('PIN_CACHE_REDIS_CHANNEL', 'pin_cache'),
+    timeout=float(os.environ.get('REDIS_SOCKET_TIMEOUT', 1.0))
+) if redis_url else None
+
+async def invalidate_room_pins(room_id: Optional[str]):
+    """Drop cached pins for a room on this worker and every other one"""
+    if not room_id:
+        return
+    pin_cache.invalidate(room_id)
+    if pin_cache_bus is not None:
+        await pin_cache_bus.publish(room_id)
+
+# Initialize emit batcher
+emit_batcher = EmitBatcher(sio, window=float(os.environ.get('SIO_BATCH_WINDOW_MS', 10)) / 1000)
+
 # Socket.IO event handlers
 @sio.event
 async def connect(sid, environ):
@@ -153,7 +584,7 @@ async def join_room(sid, data):
     }, room=room_id)
     
     # Send existing pins to the newly joined user
-    pins = await geo_store.find_pins_in_room(room_id)
+    pins = await pin_cache.get_payload(room_id, geo_store.find_pins_in_room)
     await sio.emit('pins_update', {'pins': pins}, room=sid)
 
 @sio.event
@@ -172,27 +603,40 @@ async def leave_room(sid, data):
 async def pin_created(sid, data):
     """Handle real-time pin creation"""
     room_id = data.get('room_id')
+    await invalidate_room_pins(room_id)
     
     # Broadcast to all users in the room
-    await sio.emit('pin_added', data, room=room_id)
+    emit_batcher.enqueue(room_id, {'type': 'added', 'pin': data})
 
 @sio.event
 async def pin_updated(sid, data):
     """Handle real-time pin updates"""
     room_id = data.get('room_id')
+    await invalidate_room_pins(room_id)
     
     # Broadcast to all users in the room
-    await sio.emit('pin_modified', data, room=room_id)
+    emit_batcher.enqueue(room_id, {'type': 'modified', 'pin': data})
 
 @sio.event
 async def pin_deleted(sid, data):
     """Handle real-time pin deletion"""
     room_id = data.get('room_id')
+    await invalidate_room_pins(room_id)
     
     # Broadcast to all users in the room
-    await sio.emit('pin_removed', data, room=room_id)
+    emit_batcher.enqueue(room_id, {'type': 'removed', 'pin': data})
 
 # REST API Endpoints
+def conditional_json(request: Request, payload: PreEncoded) -> Response:
+    """Serve pre-encoded JSON, or 304 when the client already holds it"""
+    headers = {"ETag": payload.etag}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in tags or payload.etag in tags or f"W/{payload.etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=payload.raw, media_type="application/json", headers=headers)
+
 @api_router.get("/")
 async def root():
     return {"message": "Event Planning Map API", "status": "active"}
@@ -200,23 +644,23 @@ async def root():
 # Room endpoints
 @api_router.post("/rooms", response_model=Room)
 async def create_room(room_data: RoomCreate):
-    room = Room(**room_data.dict())
+    room = Room.model_validate(room_data.model_dump())
     room.members = [room.created_by]  # Creator is first member
     
-    await db.rooms.insert_one(room.dict())
+    await db.rooms.insert_one(room.model_dump())
     return room
 
-@api_router.get("/rooms", response_model=List[Room])
-async def get_rooms():
-    rooms = await db.rooms.find({"is_active": True}).to_list(None)
-    return [Room(**room) for room in rooms]
+@api_router.get("/rooms")
+async def get_rooms(request: Request):
+    rooms = await db.rooms.find({"is_active": True}, {"_id": 0}).to_list(None)
+    return conditional_json(request, PreEncoded(rooms))
 
 @api_router.get("/rooms/{room_id}", response_model=Room)
 async def get_room(room_id: str):
     room = await db.rooms.find_one({"id": room_id})
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
-    return Room(**room)
+    return Room.model_validate(room)
 
 @api_router.post("/rooms/{room_id}/join")
 async def join_room_api(room_id: str, user_id: str):
@@ -234,9 +678,25 @@ async def join_room_api(room_id: str, user_id: str):
     return {"message": "Successfully joined room"}
 
 # Pin endpoints
-@api_router.post("/pins", response_model=Pin)
-async def create_pin(pin_data: PinCreate):
-    pin = Pin(
+def pin_document(pin: Pin) -> Dict:
+    """Stored form of a pin, with scalar lng/lat alongside the GeoJSON point"""
+    doc = pin.model_dump()
+    doc["lng"], doc["lat"] = pin.location.coordinates[:2]
+    return doc
+
+async def apply_room_stats(pins: List[Pin], sign: int = 1):
+    """Add pins to (or, with sign=-1, take them out of) their rooms' running sums"""
+    by_room: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+    for pin in pins:
+        stats = by_room[pin.room_id]
+        stats[0] += pin.location.coordinates[0]
+        stats[1] += pin.location.coordinates[1]
+        stats[2] += 1
+    for room_id, (sum_lng, sum_lat, count) in by_room.items():
+        await geo_store.update_room_stats(room_id, sign * sum_lng, sign * sum_lat, sign * count)
+
+def build_pin(pin_data: PinCreate) -> Pin:
+    return Pin(
         room_id=pin_data.room_id,
         title=pin_data.title,
         description=pin_data.description,
@@ -246,52 +706,104 @@ async def create_pin(pin_data: PinCreate):
         ),
         created_by=pin_data.created_by
     )
+
+@api_router.post("/pins", response_model=Pin)
+async def create_pin(pin_data: PinCreate):
+    pin = build_pin(pin_data)
     
-    # Insert to database
-    await db.pins.insert_one(pin.dict())
+    # Count the pin in its room's running sums before storing it: if that
+    # fails nothing has been written, and a failed insert is taken back out
+    await apply_room_stats([pin])
+    try:
+        await db.pins.insert_one(pin_document(pin))
+    except PyMongoError:
+        await apply_room_stats([pin], -1)
+        raise
+    await invalidate_room_pins(pin.room_id)
     
     # Emit real-time update
-    await sio.emit('pin_added', pin.dict(), room=pin.room_id)
+    emit_batcher.enqueue(pin.room_id, {'type': 'added', 'pin': pin.model_dump()})
     
     return pin
 
-@api_router.get("/pins/room/{room_id}", response_model=List[Pin])
-async def get_room_pins(room_id: str):
-    pins = await geo_store.find_pins_in_room(room_id)
-    return [Pin(**pin) for pin in pins]
+def drop_failed_inserts(pins: List[Pin], error: BulkWriteError) -> List[Pin]:
+    """Keep only the pins an unordered insert_many actually stored"""
+    failed = {err["index"] for err in error.details.get("writeErrors", [])}
+    logger.warning(
+        "Bulk pin insert: %d of %d documents failed", len(failed), len(pins)
+    )
+    return [pin for i, pin in enumerate(pins) if i not in failed]
+
+@api_router.post("/pins/bulk", response_model=List[Pin])
+async def create_pins_bulk(bulk_data: PinBulkCreate):
+    """Insert many pins in one round trip.
+
+    Inserts are unordered, so a failing document does not block the rest;
+    only the pins that were actually stored are broadcast and returned.
+    Broadcasts ride the room's pin_batch, so a bulk import is one emit.
+    Imports larger than MAX_BULK_PINS are rejected with a 422.
+    """
+    pins = [build_pin(pin_data) for pin_data in bulk_data.pins]
+    if not pins:
+        return []
+    
+    # As in create_pin, count pins before storing them and take failures back out
+    await apply_room_stats(pins)
+    try:
+        await db.pins.insert_many([pin_document(pin) for pin in pins], ordered=False)
+    except BulkWriteError as e:
+        stored = drop_failed_inserts(pins, e)
+        stored_ids = {pin.id for pin in stored}
+        await apply_room_stats([pin for pin in pins if pin.id not in stored_ids], -1)
+        pins = stored
+    except PyMongoError:
+        await apply_room_stats(pins, -1)
+        raise
+    
+    by_room: Dict[str, List[Dict]] = defaultdict(list)
+    for pin in pins:
+        by_room[pin.room_id].append(pin.model_dump())
+    for room_id, room_pins in by_room.items():
+        await invalidate_room_pins(room_id)
+        for pin_doc in room_pins:
+            emit_batcher.enqueue(room_id, {'type': 'added', 'pin': pin_doc})
+    
+    return pins
+
+@api_router.get("/pins/room/{room_id}")
+async def get_room_pins(room_id: str, request: Request):
+    # Serve the bytes already encoded for Socket.IO joiners; the ETag is
+    # computed once per cache fill, so repeat polls cost a dict lookup
+    payload = await pin_cache.get_payload(room_id, geo_store.find_pins_in_room)
+    return conditional_json(request, payload)
 
 @api_router.post("/pins/{pin_id}/vote")
 async def vote_pin(pin_id: str, user_id: str):
-    pin = await db.pins.find_one({"id": pin_id})
-    if not pin:
+    # Toggle the vote and recount in a single atomic round trip. Mongo decides
+    # add-or-remove; set operators keep voted_by duplicate-free so votes,
+    # derived from its size, can never drift
+    voted_by = {"$ifNull": ["$voted_by", []]}
+    updated_pin = await db.pins.find_one_and_update(
+        {"id": pin_id},
+        [
+            {"$set": {"voted_by": {"$cond": [
+                {"$in": [user_id, voted_by]},
+                {"$setDifference": [voted_by, [user_id]]},
+                {"$setUnion": [voted_by, [user_id]]}
+            ]}}},
+            {"$set": {"votes": {"$size": "$voted_by"}}}
+        ],
+        projection=PIN_LIST_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated_pin is None:
         raise HTTPException(status_code=404, detail="Pin not found")
     
-    voted_by = pin.get("voted_by", [])
+    action = "added" if user_id in updated_pin["voted_by"] else "removed"
     
-    if user_id in voted_by:
-        # Remove vote
-        await db.pins.update_one(
-            {"id": pin_id},
-            {
-                "$pull": {"voted_by": user_id},
-                "$inc": {"votes": -1}
-            }
-        )
-        action = "removed"
-    else:
-        # Add vote
-        await db.pins.update_one(
-            {"id": pin_id},
-            {
-                "$push": {"voted_by": user_id},
-                "$inc": {"votes": 1}
-            }
-        )
-        action = "added"
-    
-    # Get updated pin and emit real-time update
-    updated_pin = await db.pins.find_one({"id": pin_id})
-    await sio.emit('pin_modified', updated_pin, room=pin["room_id"])
+    # Emit real-time update
+    await invalidate_room_pins(updated_pin["room_id"])
+    emit_batcher.enqueue(updated_pin["room_id"], {'type': 'modified', 'pin': updated_pin})
     
     return {"message": f"Vote {action}", "votes": updated_pin["votes"]}
 
@@ -311,16 +823,16 @@ async def get_optimal_location(room_id: str):
     }
 
 @api_router.get("/pins/nearby")
-async def find_nearby_pins(longitude: float, latitude: float, max_distance: int = 5000):
+async def find_nearby_pins(longitude: float, latitude: float, max_distance: int = 5000, room_id: Optional[str] = None):
     """Find pins within specified distance"""
-    pins = await geo_store.find_nearest_pins(longitude, latitude, max_distance)
-    return {"pins": [Pin(**pin) for pin in pins], "count": len(pins)}
+    pins = await geo_store.find_nearest_pins(longitude, latitude, max_distance, room_id=room_id)
+    return ORJSONResponse({"pins": pins, "count": len(pins)})
 
 # User endpoints
 @api_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreate):
-    user = User(**user_data.dict())
-    await db.users.insert_one(user.dict())
+    user = User.model_validate(user_data.model_dump())
+    await db.users.insert_one(user.model_dump())
     return user
 
 @api_router.get("/users/{user_id}", response_model=User)
@@ -328,16 +840,32 @@ async def get_user(user_id: str):
     user = await db.users.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return User.model_validate(user)
 
 # Initialize database indexes on startup
 @app.on_event("startup")
 async def startup_event():
-    await geo_store.create_spatial_indexes()
+    if pin_cache_bus is not None:
+        pin_cache_bus.start()
+    await asyncio.gather(
+        geo_store.create_spatial_indexes(),
+        db.rooms.create_indexes([IndexModel([("id", 1)], name="id_1", unique=True)]),
+        db.users.create_indexes([IndexModel([("id", 1)], name="id_1", unique=True)]),
+    )
     print("Spatial indexes created successfully")
+    await geo_store.migrate_legacy_pins()
+    logger.info(
+        "MongoDB pool maxPoolSize=%s minPoolSize=%s topology=%s",
+        client.options.pool_options.max_pool_size,
+        client.options.pool_options.min_pool_size,
+        client.topology_description
+    )
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await emit_batcher.flush_all()
+    if pin_cache_bus is not None:
+        await pin_cache_bus.stop()
     client.close()
 
 # Include API router
@@ -347,7 +875,7 @@ app.include_router(api_router)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_origins=cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
 )
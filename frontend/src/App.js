@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { BrowserRouter, Routes, Route, Navigate } from 'react-router-dom';
 import { MapContainer, TileLayer, Marker, Popup, useMapEvents } from 'react-leaflet';
 import { io } from 'socket.io-client';
+import msgpackParser from 'socket.io-msgpack-parser';
 import axios from 'axios';
 import L from 'leaflet';
 import { Button } from './components/ui/button';
@@ -31,6 +32,8 @@ L.Marker.prototype.options.icon = DefaultIcon;
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Must match the backend's SIO_SERIALIZER setting
+const SOCKET_OPTIONS = process.env.REACT_APP_SIO_MSGPACK === '1' ? { parser: msgpackParser } : {};
 
 // Create custom pin icon
 const createPinIcon = (color = '#3b82f6', votes = 0) => {
@@ -331,7 +334,7 @@ function MapView() {
 
     useEffect(() => {
         // Initialize Socket.IO connection
-        socketRef.current = io(BACKEND_URL);
+        socketRef.current = io(BACKEND_URL, SOCKET_OPTIONS);
 
         socketRef.current.on('connect', () => {
             console.log('Connected to server');
@@ -346,18 +349,33 @@ function MapView() {
             setPins(data.pins || []);
         });
 
-        socketRef.current.on('pin_added', (pin) => {
+        const onPinAdded = (pin, notify = true) => {
             setPins(prev => [...prev.filter(p => p.id !== pin.id), pin]);
-            toast.success(`New pin added: ${pin.title}`);
-        });
+            if (notify) {
+                toast.success(`New pin added: ${pin.title}`);
+            }
+        };
 
-        socketRef.current.on('pin_modified', (pin) => {
+        const onPinModified = (pin) => {
             setPins(prev => prev.map(p => p.id === pin.id ? pin : p));
-        });
+        };
 
-        socketRef.current.on('pin_removed', (data) => {
+        const onPinRemoved = (data) => {
             setPins(prev => prev.filter(p => p.id !== data.pin_id));
             toast.info(`Pin removed: ${data.title}`);
+        };
+
+        // The server coalesces pin events per room into batches
+        const batchHandlers = { added: onPinAdded, modified: onPinModified, removed: onPinRemoved };
+        socketRef.current.on('pin_batch', (events) => {
+            const batch = events || [];
+            const addedCount = batch.filter(({ type }) => type === 'added').length;
+            // A bulk import gets one toast instead of one per pin
+            const notifyEach = addedCount <= 1;
+            batch.forEach(({ type, pin }) => batchHandlers[type]?.(pin, notifyEach));
+            if (!notifyEach) {
+                toast.success(`${addedCount} new pins added`);
+            }
         });
 
         socketRef.current.on('user_joined', (data) => {
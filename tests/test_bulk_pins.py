@@ -0,0 +1,39 @@
+import pytest
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from server import MAX_BULK_PINS, PinBulkCreate, PinCreate, build_pin, drop_failed_inserts
+
+
+def make_pin_data(title):
+    return PinCreate(
+        room_id="room", title=title, latitude=52.5, longitude=13.4, created_by="tester"
+    )
+
+
+def test_drop_failed_inserts_keeps_stored_pins():
+    pins = [build_pin(make_pin_data(f"pin {i}")) for i in range(4)]
+    error = BulkWriteError({
+        "writeErrors": [
+            {"index": 1, "code": 11000, "errmsg": "duplicate key"},
+            {"index": 3, "code": 11000, "errmsg": "duplicate key"},
+        ],
+        "nInserted": 2,
+    })
+
+    stored = drop_failed_inserts(pins, error)
+
+    assert [pin.title for pin in stored] == ["pin 0", "pin 2"]
+
+
+def test_drop_failed_inserts_without_write_errors_keeps_everything():
+    pins = [build_pin(make_pin_data(f"pin {i}")) for i in range(2)]
+
+    assert drop_failed_inserts(pins, BulkWriteError({})) == pins
+
+
+def test_bulk_create_rejects_oversized_imports():
+    PinBulkCreate(pins=[make_pin_data("ok")] * MAX_BULK_PINS)
+
+    with pytest.raises(ValidationError):
+        PinBulkCreate(pins=[make_pin_data("too many")] * (MAX_BULK_PINS + 1))
@@ -0,0 +1,54 @@
+import pytest
+from starlette.requests import Request
+
+from server import PreEncoded, conditional_json
+
+
+def make_request(if_none_match=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def payload():
+    return PreEncoded([{"id": "pin-1", "title": "Cafe"}])
+
+
+def test_without_validator_returns_body_and_etag(payload):
+    response = conditional_json(make_request(), payload)
+
+    assert response.status_code == 200
+    assert response.body == payload.raw
+    assert response.headers["etag"] == payload.etag
+    assert response.media_type == "application/json"
+
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "W/{etag}",
+    "*",
+    '"other", {etag}',
+    '"other",W/{etag}',
+])
+def test_matching_validator_returns_not_modified(payload, header):
+    response = conditional_json(make_request(header.format(etag=payload.etag)), payload)
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == payload.etag
+
+
+def test_stale_validator_returns_body(payload):
+    stale = PreEncoded([{"id": "pin-1", "title": "Old cafe"}])
+
+    response = conditional_json(make_request(stale.etag), payload)
+
+    assert response.status_code == 200
+    assert response.body == payload.raw
+
+
+def test_etag_follows_content():
+    assert PreEncoded([1, 2]).etag == PreEncoded([1, 2]).etag
+    assert PreEncoded([1, 2]).etag != PreEncoded([2, 1]).etag
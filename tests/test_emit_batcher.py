@@ -0,0 +1,101 @@
+import asyncio
+
+from server import EmitBatcher
+
+
+class FakeServer:
+    def __init__(self, fail_rooms=()):
+        self.emitted = []
+        self.fail_rooms = set(fail_rooms)
+
+    async def emit(self, event, data, room=None, **kwargs):
+        if room in self.fail_rooms:
+            raise RuntimeError("transport closed")
+        self.emitted.append((event, room, data))
+
+
+def added(pin_id):
+    return {"type": "added", "pin": {"id": pin_id}}
+
+
+def test_events_in_one_window_are_coalesced_per_room():
+    async def run():
+        server = FakeServer()
+        batcher = EmitBatcher(server, window=0.01)
+        for i in range(3):
+            batcher.enqueue("a", added(i))
+        batcher.enqueue("b", added(9))
+        await asyncio.sleep(0.05)
+        return server.emitted
+
+    emitted = asyncio.run(run())
+    assert emitted == [
+        ("pin_batch", "a", [added(0), added(1), added(2)]),
+        ("pin_batch", "b", [added(9)]),
+    ]
+
+
+def test_event_after_flush_opens_a_new_window():
+    async def run():
+        server = FakeServer()
+        batcher = EmitBatcher(server, window=0.01)
+        batcher.enqueue("a", added(1))
+        await asyncio.sleep(0.05)
+        batcher.enqueue("a", added(2))
+        await asyncio.sleep(0.05)
+        return server.emitted
+
+    assert asyncio.run(run()) == [
+        ("pin_batch", "a", [added(1)]),
+        ("pin_batch", "a", [added(2)]),
+    ]
+
+
+def test_events_without_room_are_dropped():
+    async def run():
+        server = FakeServer()
+        batcher = EmitBatcher(server, window=0.01)
+        batcher.enqueue(None, added(1))
+        batcher.enqueue("", added(2))
+        await asyncio.sleep(0.05)
+        return server.emitted, batcher._pending
+
+    emitted, pending = asyncio.run(run())
+    assert emitted == []
+    assert pending == {}
+
+
+def test_flush_all_emits_pending_events_once():
+    async def run():
+        server = FakeServer()
+        batcher = EmitBatcher(server, window=10)
+        batcher.enqueue("a", added(1))
+        batcher.enqueue("b", added(2))
+        await batcher.flush_all()
+        flushed = list(server.emitted)
+        # The window timers find nothing left to send
+        await batcher.flush_all()
+        for task in list(batcher._tasks):
+            task.cancel()
+        return flushed, server.emitted
+
+    flushed, emitted = asyncio.run(run())
+    assert flushed == [
+        ("pin_batch", "a", [added(1)]),
+        ("pin_batch", "b", [added(2)]),
+    ]
+    assert emitted == flushed
+
+
+def test_failed_emit_does_not_block_other_rooms():
+    async def run():
+        server = FakeServer(fail_rooms={"a"})
+        batcher = EmitBatcher(server, window=0.01)
+        batcher.enqueue("a", added(1))
+        batcher.enqueue("b", added(2))
+        await asyncio.sleep(0.05)
+        return server.emitted, batcher._pending
+
+    emitted, pending = asyncio.run(run())
+    assert emitted == [("pin_batch", "b", [added(2)])]
+    assert pending == {}
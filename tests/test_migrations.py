@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from pymongo.errors import DuplicateKeyError
+
+import server
+
+
+class FakeMigrations:
+    def __init__(self, markers=None):
+        self.markers = markers or {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.markers:
+            raise DuplicateKeyError("duplicate migration marker")
+        self.markers[doc["_id"]] = dict(doc)
+
+    async def find_one_and_update(self, query, update):
+        marker = self.markers.get(query["_id"])
+        if marker is None or "finished_at" in marker:
+            return None
+        if marker["started_at"] >= query["started_at"]["$lt"]:
+            return None
+        marker.update(update["$set"])
+        return marker
+
+    async def find_one(self, query):
+        return self.markers.get(query["_id"])
+
+
+class FakeRoomStats:
+    def __init__(self, rooms):
+        self.rooms = rooms
+
+    async def find_one(self, query):
+        return self.rooms.get(query["_id"])
+
+
+def make_store(markers=None, rooms=None):
+    db = SimpleNamespace(migrations=FakeMigrations(markers), room_stats=FakeRoomStats(rooms or {}))
+    return server.GeoStore(db)
+
+
+def test_claim_is_exclusive_while_running():
+    store = make_store()
+
+    assert asyncio.run(store._claim_migration("legacy_pins"))
+    assert not asyncio.run(store._claim_migration("legacy_pins"))
+
+
+def test_expired_unfinished_claim_is_taken_over():
+    stale = datetime.now(timezone.utc) - server.MIGRATION_LEASE - timedelta(minutes=1)
+    store = make_store({"legacy_pins": {"_id": "legacy_pins", "started_at": stale}})
+
+    assert asyncio.run(store._claim_migration("legacy_pins"))
+
+
+def test_finished_migration_is_never_reclaimed():
+    long_ago = datetime.now(timezone.utc) - server.MIGRATION_LEASE * 10
+    store = make_store({"legacy_pins": {"_id": "legacy_pins", "started_at": long_ago, "finished_at": long_ago}})
+
+    assert not asyncio.run(store._claim_migration("legacy_pins"))
+
+
+def test_centroid_combines_live_and_legacy_sums():
+    done = datetime.now(timezone.utc)
+    store = make_store(
+        {"legacy_pins": {"_id": "legacy_pins", "started_at": done, "finished_at": done}},
+        {"room": {
+            "sum_lng": 10.0, "sum_lat": 50.0, "count": 1,
+            "legacy_sum_lng": 30.0, "legacy_sum_lat": 110.0, "legacy_count": 2
+        }}
+    )
+
+    centroid = asyncio.run(store.calculate_centroid("room"))
+
+    assert centroid == {"longitude": 40.0 / 3, "latitude": 160.0 / 3, "type": "centroid"}
+
+
+def test_centroid_scans_until_migration_finishes(monkeypatch):
+    store = make_store(
+        {"legacy_pins": {"_id": "legacy_pins", "started_at": datetime.now(timezone.utc)}},
+        {"room": {"sum_lng": 10.0, "sum_lat": 50.0, "count": 1}}
+    )
+    scanned = {"longitude": 1.0, "latitude": 2.0, "type": "centroid"}
+
+    async def scan(room_id):
+        return scanned
+
+    monkeypatch.setattr(store, "_scan_centroid", scan)
+
+    assert asyncio.run(store.calculate_centroid("room")) is scanned
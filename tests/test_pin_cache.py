@@ -0,0 +1,136 @@
+import asyncio
+
+import orjson
+
+from server import PinCacheBus, RoomPinCache
+
+
+class FakeLoader:
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, room_id):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return [{"id": f"pin-{self.calls}", "room_id": room_id}]
+
+
+def test_concurrent_callers_share_one_load():
+    async def run():
+        cache = RoomPinCache()
+        loader = FakeLoader()
+        payloads = await asyncio.gather(*[cache.get_payload("room", loader) for _ in range(10)])
+        return loader.calls, {id(p) for p in payloads}, payloads[0]
+
+    calls, distinct, payload = asyncio.run(run())
+    assert calls == 1
+    assert len(distinct) == 1
+    assert orjson.loads(payload.raw) == [{"id": "pin-1", "room_id": "room"}]
+
+
+def test_invalidate_forces_reload():
+    async def run():
+        cache = RoomPinCache()
+        loader = FakeLoader()
+        await cache.get_payload("room", loader)
+        await cache.get_payload("room", loader)
+        cache.invalidate("room")
+        await cache.get_payload("room", loader)
+        return loader.calls
+
+    assert asyncio.run(run()) == 2
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    async def run():
+        cache = RoomPinCache()
+        loader = FakeLoader()
+        loader.release = asyncio.Event()
+
+        stale = asyncio.ensure_future(cache.get_payload("room", loader))
+        await asyncio.sleep(0)
+        cache.invalidate("room")
+        loader.release.set()
+        stale_payload = await stale
+
+        fresh_payload = await cache.get_payload("room", loader)
+        return loader.calls, stale_payload, fresh_payload
+
+    calls, stale_payload, fresh_payload = asyncio.run(run())
+    assert calls == 2
+    assert orjson.loads(stale_payload.raw)[0]["id"] == "pin-1"
+    assert orjson.loads(fresh_payload.raw)[0]["id"] == "pin-2"
+
+
+def test_caller_after_invalidation_does_not_join_stale_load():
+    async def run():
+        cache = RoomPinCache()
+        loader = FakeLoader()
+        loader.release = asyncio.Event()
+
+        stale = asyncio.ensure_future(cache.get_payload("room", loader))
+        await asyncio.sleep(0)
+        cache.invalidate("room")
+        fresh = asyncio.ensure_future(cache.get_payload("room", loader))
+        await asyncio.sleep(0)
+        loader.release.set()
+        stale_payload, fresh_payload = await stale, await fresh
+        return loader.calls, stale_payload, fresh_payload
+
+    calls, stale_payload, fresh_payload = asyncio.run(run())
+    assert calls == 2
+    assert stale_payload is not fresh_payload
+
+
+def test_expired_entries_are_dropped():
+    async def run():
+        cache = RoomPinCache(ttl=0)
+        loader = FakeLoader()
+        await cache.get_payload("room", loader)
+        assert cache._fresh("room") is None
+        return len(cache._entries)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_cache_is_bounded_lru():
+    async def run():
+        cache = RoomPinCache(max_rooms=2)
+        loader = FakeLoader()
+        await cache.get_payload("a", loader)
+        await cache.get_payload("b", loader)
+        await cache.get_payload("a", loader)  # a is now most recent
+        await cache.get_payload("c", loader)
+        return list(cache._entries), cache._loading
+
+    rooms, loading = asyncio.run(run())
+    assert rooms == ["a", "c"]
+    assert loading == {}
+
+
+def test_bus_invalidates_rooms_from_other_workers_only():
+    async def run():
+        cache = RoomPinCache()
+        loader = FakeLoader()
+        bus = PinCacheBus(cache, "redis://localhost:6379/0", "pin_cache")
+        await cache.get_payload("mine", loader)
+        await cache.get_payload("theirs", loader)
+        bus._handle({"data": orjson.dumps({"host_id": bus.host_id, "room_id": "mine"})})
+        bus._handle({"data": orjson.dumps({"host_id": "other", "room_id": "theirs"})})
+        return list(cache._entries)
+
+    assert asyncio.run(run()) == ["mine"]
+
+
+def test_bus_ignores_malformed_messages():
+    async def run():
+        cache = RoomPinCache()
+        await cache.get_payload("room", FakeLoader())
+        bus = PinCacheBus(cache, "redis://localhost:6379/0", "pin_cache")
+        for data in (b"not json", orjson.dumps({"room_id": "room"}), orjson.dumps([1, 2])):
+            bus._handle({"data": data})
+        return list(cache._entries)
+
+    assert asyncio.run(run()) == ["room"]
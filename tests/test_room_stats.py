@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError, PyMongoError
+
+import server
+
+
+class FakeRoomStats:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rooms = {}
+
+    async def update_one(self, query, update, upsert=False):
+        if self.fail:
+            raise PyMongoError("room_stats unavailable")
+        stats = self.rooms.setdefault(query["_id"], {"sum_lng": 0.0, "sum_lat": 0.0, "count": 0})
+        for key, delta in update["$inc"].items():
+            stats[key] += delta
+
+
+class FakePins:
+    def __init__(self, error=None):
+        self.error = error
+        self.inserted = []
+
+    async def insert_one(self, doc):
+        if self.error:
+            raise self.error
+        self.inserted.append(doc)
+
+    async def insert_many(self, docs, ordered=True):
+        if self.error:
+            raise self.error
+        self.inserted.extend(docs)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(pins_error=None, stats_fail=False):
+        db = SimpleNamespace(pins=FakePins(pins_error), room_stats=FakeRoomStats(stats_fail))
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server.geo_store, "db", db)
+        monkeypatch.setattr(server, "invalidate_room_pins", lambda room_id: asyncio.sleep(0))
+        monkeypatch.setattr(server.emit_batcher, "enqueue", lambda room_id, event: None)
+        return db
+    return install
+
+
+def make_pin_data(title, longitude=13.4, latitude=52.5):
+    return server.PinCreate(
+        room_id="room", title=title, latitude=latitude, longitude=longitude, created_by="tester"
+    )
+
+
+def test_create_pin_counts_stored_pin(fake_db):
+    db = fake_db()
+
+    asyncio.run(server.create_pin(make_pin_data("Cafe")))
+
+    assert len(db.pins.inserted) == 1
+    assert db.room_stats.rooms["room"] == {"sum_lng": 13.4, "sum_lat": 52.5, "count": 1}
+
+
+def test_create_pin_stats_failure_writes_nothing(fake_db):
+    db = fake_db(stats_fail=True)
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(server.create_pin(make_pin_data("Cafe")))
+
+    assert db.pins.inserted == []
+
+
+def test_create_pin_insert_failure_is_taken_out_of_stats(fake_db):
+    db = fake_db(pins_error=PyMongoError("insert failed"))
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(server.create_pin(make_pin_data("Cafe")))
+
+    assert db.room_stats.rooms["room"]["count"] == 0
+
+
+def test_bulk_partial_failure_only_counts_stored_pins(fake_db):
+    db = fake_db(pins_error=BulkWriteError({"writeErrors": [{"index": 1}]}))
+    bulk = server.PinBulkCreate(pins=[
+        make_pin_data("a", longitude=1.0, latitude=2.0),
+        make_pin_data("b", longitude=10.0, latitude=20.0),
+    ])
+
+    stored = asyncio.run(server.create_pins_bulk(bulk))
+
+    assert [pin.title for pin in stored] == ["a"]
+    assert db.room_stats.rooms["room"] == {"sum_lng": 1.0, "sum_lat": 2.0, "count": 1}